@@ -9,22 +9,31 @@ Fixes:
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hmac
 import os
 import mimetypes
+import threading
 import time
+import urllib.parse
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Dict
 
 from pathlib import Path as FilePath
 import jwt
-from fastapi import FastAPI, Depends, HTTPException, status, Request, Query, Path, UploadFile, File, Response
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Query, Path, UploadFile, File, Response, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, constr
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime, Text, LargeBinary, text, inspect
+    create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime, Text, LargeBinary, text, inspect, select, and_, or_
 )
-from sqlalchemy.orm import sessionmaker, declarative_base, relationship, Session
+from sqlalchemy.orm import sessionmaker, declarative_base, relationship, Session, joinedload, deferred, load_only
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.exc import IntegrityError
 
 try:
@@ -34,6 +43,18 @@ except Exception:
     boto3 = None
     ClientError = Exception
 
+try:
+    import redis.asyncio as aioredis
+    from redis.asyncio.retry import Retry
+    from redis.backoff import NoBackoff
+except Exception:
+    aioredis = None
+
+try:
+    from passlib.context import CryptContext
+except Exception:
+    CryptContext = None
+
 # --------------------- Config ---------------------
 # Build a default absolute SQLite URL next to this file (backend/todos.db)
 _DEFAULT_DB_PATH = FilePath(__file__).with_name("todos.db").resolve()
@@ -44,13 +65,24 @@ SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-me")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 EMAIL_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 ALGORITHM = "HS256"
+_SECRET_BYTES = SECRET_KEY.encode()
+_jwt = jwt.PyJWT()  # reused for every encode/decode
+_JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
 
 S3_BUCKET = os.getenv("S3_BUCKET", "").strip()
 S3_REGION = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or ""
 S3_PREFIX = os.getenv("S3_PREFIX", "avatars/")
 S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+AVATAR_URL_TTL_SECONDS = int(os.getenv("AVATAR_URL_TTL_SECONDS", "300"))
+MAX_AVATAR_BYTES = 2 * 1024 * 1024
 SESSION_TABLE = os.getenv("SESSION_TABLE", "").strip()
 SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+REDIS_TIMEOUT_SECONDS = float(os.getenv("REDIS_TIMEOUT_SECONDS", "0.2"))
+REDIS_RETRY_AFTER_SECONDS = int(os.getenv("REDIS_RETRY_AFTER_SECONDS", "30"))
+# "plaintext" (current behaviour) or "bcrypt"; BCRYPT_ROUNDS trades login CPU for hash strength.
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "plaintext").strip().lower()
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 # --------------------- DB setup ---------------------
 engine = create_engine(
@@ -61,6 +93,38 @@ engine = create_engine(
     ),
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _sqlite_ro_url(url: str) -> Optional[URL]:
+    # sqlite:///<path> -> sqlite:///file:<path>?mode=ro&uri=true (file databases only)
+    try:
+        parsed = make_url(url)
+    except Exception:
+        return None
+    path = parsed.database
+    if parsed.get_backend_name() != "sqlite" or not path or path == ":memory:" or parsed.query:
+        return None
+    # SQLite percent-decodes URI paths, so '#', '%', '?' etc. must be escaped. Build the URL
+    # object directly: parsing a URL string would decode the escapes again.
+    return URL.create(
+        "sqlite",
+        database=f"file:{urllib.parse.quote(path, safe='/:')}",
+        query={"mode": "ro", "uri": "true"},
+    )
+
+
+# Read-only pool for GET handlers: under WAL readers never block the writer.
+_RO_DATABASE_URL = _sqlite_ro_url(DATABASE_URL)
+if _RO_DATABASE_URL:
+    engine_ro = create_engine(
+        _RO_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=20,
+    )
+    SessionLocalRO = sessionmaker(autocommit=False, autoflush=False, bind=engine_ro)
+else:
+    engine_ro = engine
+    SessionLocalRO = SessionLocal
 Base = declarative_base()
 
 
@@ -72,8 +136,10 @@ class User(Base):
     is_admin = Column(Boolean, default=False, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     email_verified = Column(Boolean, default=False, nullable=False)
-    profile_image = Column(LargeBinary, nullable=True)
+    # Local fallback only (no S3 configured); deferred so user lookups never pull the blob.
+    profile_image = deferred(Column(LargeBinary, nullable=True))
     profile_image_mime = Column(String, nullable=True)
+    profile_image_key = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
 
@@ -103,43 +169,66 @@ class EmailVerificationToken(Base):
 
 Base.metadata.create_all(bind=engine)
 
-# Ensure avatar columns exist (simple runtime migration for SQLite)
-def _ensure_avatar_columns():
+def _run_migration(name: str, migrate) -> None:
+    """Run `migrate(conn)` once per database, recorded in schema_meta.
+
+    On SQLite the check-and-set runs under BEGIN IMMEDIATE so that, when several
+    workers boot at once, one migrates and the rest just see the marker.
+    """
     try:
-        inspector = inspect(engine)
-        cols = {c["name"] for c in inspector.get_columns("users")}
-        statements = []
-        if "profile_image" not in cols:
-            statements.append("ALTER TABLE users ADD COLUMN profile_image BLOB")
-        if "profile_image_mime" not in cols:
-            statements.append("ALTER TABLE users ADD COLUMN profile_image_mime VARCHAR")
-        if statements:
-            with engine.begin() as conn:
-                for stmt in statements:
-                    conn.execute(text(stmt))
+        with engine.connect() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS schema_meta (key TEXT PRIMARY KEY, value TEXT)"))
+            conn.commit()
+            if conn.execute(text("SELECT value FROM schema_meta WHERE key = :k"), {"k": name}).scalar():
+                return
+            conn.rollback()
+            if DATABASE_URL.startswith("sqlite"):
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            if conn.execute(text("SELECT value FROM schema_meta WHERE key = :k"), {"k": name}).scalar():
+                conn.rollback()
+                return
+            migrate(conn)
+            conn.execute(text("INSERT INTO schema_meta (key, value) VALUES (:k, '1')"), {"k": name})
+            conn.commit()
     except Exception:
         # best-effort; ignore if not supported
         pass
 
-_ensure_avatar_columns()
 
+# Ensure avatar columns exist (simple runtime migration for SQLite)
+def _ensure_avatar_columns(conn):
+    cols = {c["name"] for c in inspect(conn).get_columns("users")}
+    if "profile_image" not in cols:
+        conn.execute(text("ALTER TABLE users ADD COLUMN profile_image BLOB"))
+    if "profile_image_mime" not in cols:
+        conn.execute(text("ALTER TABLE users ADD COLUMN profile_image_mime VARCHAR"))
+    if "profile_image_key" not in cols:
+        conn.execute(text("ALTER TABLE users ADD COLUMN profile_image_key VARCHAR"))
+
+
+_run_migration("avatar_cols", _ensure_avatar_columns)
+
+
+def _ensure_token_index_non_unique(conn):
+    indexes = inspect(conn).get_indexes("email_verification_tokens")
+    unique_token_indexes = [idx for idx in indexes if idx.get("unique") and idx.get("column_names") == ["token"]]
+    if unique_token_indexes:
+        for idx in unique_token_indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {idx['name']}"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_email_verification_tokens_token ON email_verification_tokens (token)"))
 
-def _ensure_token_index_non_unique():
-    try:
-        inspector = inspect(engine)
-        indexes = inspector.get_indexes("email_verification_tokens")
-        unique_token_indexes = [idx for idx in indexes if idx.get("unique") and idx.get("column_names") == ["token"]]
-        if unique_token_indexes:
-            with engine.begin() as conn:
-                for idx in unique_token_indexes:
-                    conn.execute(text(f"DROP INDEX IF EXISTS {idx['name']}"))
-            with engine.begin() as conn:
-                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_email_verification_tokens_token ON email_verification_tokens (token)"))
-    except Exception:
-        pass
 
+_run_migration("token_index_non_unique", _ensure_token_index_non_unique)
 
-_ensure_token_index_non_unique()
+
+def _ensure_indexes(conn):
+    # Composite/sort indexes backing the list endpoints' ORDER BY created_at DESC.
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_todos_owner_created ON todos (owner_id, created_at DESC)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_todos_created_at ON todos (created_at DESC)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at DESC)"))
+
+
+_run_migration("created_at_indexes", _ensure_indexes)
 
 # SQLite pragmas for better concurrency
 if DATABASE_URL.startswith("sqlite"):
@@ -152,8 +241,22 @@ if DATABASE_URL.startswith("sqlite"):
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("PRAGMA synchronous=NORMAL")
         cursor.execute("PRAGMA busy_timeout=30000")  # ms
+        cursor.execute("PRAGMA cache_size=-64000")  # KiB, i.e. ~64 MiB page cache
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        cursor.execute("PRAGMA wal_autocheckpoint=1000")  # pages
         cursor.close()
 
+    if engine_ro is not engine:
+        @event.listens_for(engine_ro, "connect")
+        def set_sqlite_ro_pragma(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA busy_timeout=30000")  # ms
+            cursor.execute("PRAGMA cache_size=-64000")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")
+            cursor.close()
+
 def _s3():
     if not S3_BUCKET or boto3 is None:
         return None
@@ -187,24 +290,82 @@ def get_db() -> Session:
         db.close()
 
 
+def get_db_ro() -> Session:
+    db = SessionLocalRO()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _pwd_context():
+    if PASSWORD_HASH_SCHEME != "bcrypt" or CryptContext is None:
+        return None
+    try:
+        return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    except Exception as e:
+        print(f"[Password hashing init failed] {e}")
+        return None
+
+
+pwd_context = _pwd_context()
+
+
 def hash_password(password: str) -> str:
+    if pwd_context:
+        return pwd_context.hash(password)
     return password
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return plain == hashed
+    # Accounts created before hashing was enabled still hold the plain value.
+    if pwd_context and pwd_context.identify(hashed):
+        return pwd_context.verify(plain, hashed)
+    return hmac.compare_digest(plain.encode(), hashed.encode())
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return _jwt.encode(to_encode, _SECRET_BYTES, algorithm=ALGORITHM)
+
+
+# Small TTL+LRU cache of verified JWT claims keyed by the raw token string.
+_TOKEN_CACHE_MAXSIZE = 4096
+_TOKEN_CACHE_TTL_SECONDS = 60
+_token_cache: "OrderedDict[str, tuple[dict, float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _verify_token(token: str) -> dict:
+    """Return verified claims, serving repeats from the cache. Raises jwt errors on failure."""
+    now = time.time()
+    with _token_cache_lock:
+        hit = _token_cache.get(token)
+        if hit is not None:
+            payload, cached_until = hit
+            if now < cached_until and payload.get("exp", 0) > now:
+                _token_cache.move_to_end(token)
+                return payload
+            del _token_cache[token]
+    payload = _jwt.decode(token, _SECRET_BYTES, algorithms=[ALGORITHM], options=_JWT_DECODE_OPTIONS)
+    with _token_cache_lock:
+        _token_cache[token] = (payload, now + _TOKEN_CACHE_TTL_SECONDS)
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > _TOKEN_CACHE_MAXSIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+
+def _forget_token(token: str) -> None:
+    with _token_cache_lock:
+        _token_cache.pop(token, None)
 
 
 def decode_token(token: str) -> dict:
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return _verify_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -213,27 +374,116 @@ def decode_token(token: str) -> dict:
 
 # --------------------- Rate Limiter ---------------------
 class SimpleRateLimiter:
-    """Leaky-bucket style in-memory rate limiter."""
+    """Token-bucket in-memory rate limiter: `limit` requests per `per_seconds`, refilled continuously."""
     def __init__(self, limit: int, per_seconds: int):
         self.limit = limit
         self.per = per_seconds
-        self.buckets: Dict[str, List[float]] = {}
+        self.rate = limit / per_seconds
+        # key -> (tokens, last_refill)
+        self.buckets: Dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._next_reap = time.monotonic() + per_seconds
+
+    def _reap(self, now: float):
+        # A bucket idle for a full window is back at capacity, so dropping it is lossless.
+        cutoff = now - self.per
+        for key in [k for k, (_, last) in self.buckets.items() if last < cutoff]:
+            del self.buckets[key]
+        self._next_reap = now + self.per
 
     def hit(self, key: str):
-        now = time.time()
-        window_start = now - self.per
-        q = [t for t in self.buckets.get(key, []) if t >= window_start]
-        if len(q) >= self.limit:
-            q = q[-self.limit:]
-            self.buckets[key] = q
-            reset = int(min(q) + self.per - now)
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_reap:
+                self._reap(now)
+            tokens, last = self.buckets.get(key, (float(self.limit), now))
+            tokens = min(float(self.limit), tokens + (now - last) * self.rate)
+            if tokens < 1.0:
+                self.buckets[key] = (tokens, now)
+                retry_after = (1.0 - tokens) / self.rate
+                raise HTTPException(status_code=429, detail=f"Rate limit exceeded. Try again in {max(int(retry_after), 1)}s")
+            self.buckets[key] = (tokens - 1.0, now)
+
+
+class RedisRateLimiter:
+    """Fixed-window rate limiter shared by all workers through Redis (one round-trip per hit)."""
+    _SCRIPT = """
+local c = redis.call('INCR', KEYS[1])
+if c == 1 then redis.call('PEXPIRE', KEYS[1], ARGV[1]) end
+return {c, redis.call('PTTL', KEYS[1])}
+"""
+
+    def __init__(self, client, limit: int, per_seconds: int, fallback: SimpleRateLimiter, prefix: str = "rl:"):
+        self.limit = limit
+        self.per = per_seconds
+        self.prefix = prefix
+        self.fallback = fallback
+        self._script = client.register_script(self._SCRIPT)
+        self._failing = False
+        self._retry_at = 0.0
+
+    async def hit(self, key: str):
+        # After a failure, stay on the local limiter for a cooldown before probing Redis again,
+        # so a hung Redis doesn't add its timeout to every request.
+        if self._failing and time.monotonic() < self._retry_at:
+            self.fallback.hit(key)
+            return
+        try:
+            # Hard cap in case the client's socket timeouts don't cover a stalled call.
+            count, pttl = await asyncio.wait_for(
+                self._script(keys=[self.prefix + key], args=[self.per * 1000]),
+                timeout=REDIS_TIMEOUT_SECONDS * 2,
+            )
+        except Exception as e:
+            # Redis unavailable: degrade to this worker's local limiter rather than failing requests.
+            # Report only the transition so an outage doesn't print on every request.
+            self._retry_at = time.monotonic() + REDIS_RETRY_AFTER_SECONDS
+            if not self._failing:
+                self._failing = True
+                print(f"[Redis rate limit failed; using local limiter] {e!r}")
+            self.fallback.hit(key)
+            return
+        if self._failing:
+            self._failing = False
+            print("[Redis rate limit recovered]")
+        if int(count) > self.limit:
+            reset = int(pttl) // 1000 if int(pttl) > 0 else self.per
             raise HTTPException(status_code=429, detail=f"Rate limit exceeded. Try again in {max(reset, 1)}s")
-        q.append(now)
-        self.buckets[key] = q
 
 
-unauth_rl = SimpleRateLimiter(limit=30, per_seconds=60)   # 30 req/min per IP
-auth_rl = SimpleRateLimiter(limit=120, per_seconds=60)    # 120 req/min per user
+def _redis():
+    if not REDIS_URL or aioredis is None:
+        return None
+    try:
+        # Short timeouts and no retries: the limiter sits on every request's path.
+        return aioredis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+            socket_timeout=REDIS_TIMEOUT_SECONDS,
+            retry_on_timeout=False,
+            retry=Retry(NoBackoff(), 0),
+        )
+    except Exception as e:
+        print(f"[Redis client init failed] {e}")
+        return None
+
+
+def _make_rate_limiter(limit: int, per_seconds: int):
+    local = SimpleRateLimiter(limit=limit, per_seconds=per_seconds)
+    client = _redis()
+    if client is None:
+        return local
+    return RedisRateLimiter(client, limit=limit, per_seconds=per_seconds, fallback=local)
+
+
+async def _rate_limit(limiter, key: str):
+    result = limiter.hit(key)
+    if asyncio.iscoroutine(result):
+        await result
+
+
+unauth_rl = _make_rate_limiter(limit=30, per_seconds=60)   # 30 req/min per IP
+auth_rl = _make_rate_limiter(limit=120, per_seconds=60)    # 120 req/min per user
 
 
 # --------------------- Schemas ---------------------
@@ -322,6 +572,32 @@ def _resp_list(model, objs):
     return [_resp(model, o) for o in objs]
 
 
+@functools.lru_cache(maxsize=None)
+def _trusted_fields(model):
+    # (field name, nested model or None); v2: model_fields/annotation, v1: __fields__/type_
+    fields = model.model_fields if hasattr(model, "model_fields") else model.__fields__
+    out = []
+    for name, f in fields.items():
+        tp = getattr(f, "annotation", None) if hasattr(model, "model_fields") else f.type_
+        nested = tp if isinstance(tp, type) and issubclass(tp, BaseModel) else None
+        out.append((name, nested))
+    return tuple(out)
+
+
+def _resp_trusted(model, obj):
+    # Rows loaded from typed DB columns: build the model without re-running validation.
+    values = {}
+    for name, nested in _trusted_fields(model):
+        v = getattr(obj, name)
+        values[name] = _resp_trusted(nested, v) if nested is not None and v is not None else v
+    construct = model.model_construct if hasattr(model, "model_construct") else model.construct
+    return construct(**values)
+
+
+def _resp_list_trusted(model, objs):
+    return [_resp_trusted(model, o) for o in objs]
+
+
 # --------------------- Dependencies ---------------------
 def get_current_user(request: Request, token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     t = _ddb_table()
@@ -338,7 +614,10 @@ def get_current_user(request: Request, token: Optional[str] = Depends(oauth2_sch
                 if u and u.is_active:
                     return u
     if token:
-        payload = decode_token(token)
+        # Reuse the payload the rate-limit middleware already verified for this request.
+        payload = getattr(request.state, "jwt_payload", None)
+        if payload is None or getattr(request.state, "jwt_token", None) != token:
+            payload = decode_token(token)
     else:
         raise HTTPException(status_code=401, detail="Missing credentials")
     uid = payload.get("sub")
@@ -373,34 +652,35 @@ async def apply_rate_limit(request: Request, call_next):
     if auth.lower().startswith("bearer"):
         token = auth.split(" ", 1)[1].strip()
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = _verify_token(token)
+            request.state.jwt_payload = payload
+            request.state.jwt_token = token
             uid = payload.get("sub")
             if uid is not None:
-                auth_rl.hit(f"user:{uid}")
+                await _rate_limit(auth_rl, f"user:{uid}")
                 return await call_next(request)
         except Exception:
             pass
     # Fallback: per-IP
-    unauth_rl.hit(f"ip:{request.client.host}")
+    await _rate_limit(unauth_rl, f"ip:{request.client.host}")
     return await call_next(request)
 
 
 # --------------------- Auth routes ---------------------
 @app.post("/auth/register", response_model=UserOut, status_code=201)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+def register(user_in: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # Fast pre-check
-    if db.query(User).filter(User.email == user_in.email).first():
+    if db.execute(select(1).where(User.email == user_in.email).limit(1)).first():
         raise HTTPException(status_code=409, detail="Email already registered")
 
     user = User(email=user_in.email, hashed_password=hash_password(user_in.password))
     db.add(user)
     try:
-        db.commit()
+        db.flush()  # assigns user.id; user and token commit together below
     except IntegrityError:
         db.rollback()
         # Handle unique constraint race
         raise HTTPException(status_code=409, detail="Email already registered")
-    db.refresh(user)
 
     # Create mock verification token
     token = "a1"
@@ -423,9 +703,14 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
                 expires_at=expires_at,
             )
         )
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Email already registered")
 
-    print(f"[MOCK EMAIL] Verify your email: http://localhost:8000/auth/verify-email?token={token}")
+    # Emitted after the response is sent so stdout locking stays off the request path.
+    background_tasks.add_task(print, f"[MOCK EMAIL] Verify your email: http://localhost:8000/auth/verify-email?token={token}")
     return _resp(UserOut, user)
 
 
@@ -458,9 +743,18 @@ def verify_email(token: str = Query(..., min_length=1), db: Session = Depends(ge
 @app.post("/auth/login", response_model=TokenOut)
 def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     # NOTE: pass email in the 'username' field
-    user: User | None = db.query(User).filter(User.email == form_data.username).first()
+    user: User | None = (
+        db.query(User)
+        .options(load_only(User.id, User.hashed_password, User.email_verified, User.is_active, User.is_admin))
+        .filter(User.email == form_data.username)
+        .first()
+    )
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if pwd_context and not pwd_context.identify(user.hashed_password):
+        # Upgrade accounts created before hashing was enabled on their next successful login.
+        user.hashed_password = pwd_context.hash(form_data.password)
+        db.commit()
     if not user.email_verified:
         raise HTTPException(status_code=403, detail="Email not verified")
     if not user.is_active:
@@ -480,7 +774,9 @@ def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends(),
     return TokenOut(access_token=token, expires_in=int(expires.total_seconds()))
 
 @app.post("/auth/logout", status_code=204)
-def logout(request: Request, response: Response):
+def logout(request: Request, response: Response, token: Optional[str] = Depends(oauth2_scheme)):
+    if token:
+        _forget_token(token)
     sid = request.cookies.get("session_id")
     t = _ddb_table()
     if sid and t:
@@ -494,9 +790,9 @@ def logout(request: Request, response: Response):
 
 # --------------------- Todo routes (User-scoped) ---------------------
 @app.get("/todos", response_model=List[TodoOut])
-def list_my_todos(user: User = Depends(require_verified_user), db: Session = Depends(get_db)):
+def list_my_todos(user: User = Depends(require_verified_user), db: Session = Depends(get_db_ro)):
     items = db.query(Todo).filter(Todo.owner_id == user.id).order_by(Todo.created_at.desc()).all()
-    return _resp_list(TodoOut, items)
+    return _resp_list_trusted(TodoOut, items)
 
 
 @app.post("/todos", response_model=TodoOut, status_code=201)
@@ -504,12 +800,11 @@ def create_todo(todo_in: TodoCreate, user: User = Depends(require_verified_user)
     item = Todo(owner_id=user.id, title=todo_in.title, description=todo_in.description or "")
     db.add(item)
     db.commit()
-    db.refresh(item)
     return _resp(TodoOut, item)
 
 
 @app.get("/todos/{todo_id}", response_model=TodoOut)
-def get_todo(todo_id: int = Path(..., ge=1), user: User = Depends(require_verified_user), db: Session = Depends(get_db)):
+def get_todo(todo_id: int = Path(..., ge=1), user: User = Depends(require_verified_user), db: Session = Depends(get_db_ro)):
     item: Todo | None = db.get(Todo, todo_id)
     if not item or item.owner_id != user.id:
         raise HTTPException(status_code=404, detail="Todo not found")
@@ -533,7 +828,6 @@ def update_todo(
     if updates.done is not None:
         item.done = updates.done
     db.commit()
-    db.refresh(item)
     return _resp(TodoOut, item)
 
 
@@ -549,9 +843,9 @@ def delete_todo(todo_id: int, user: User = Depends(require_verified_user), db: S
 
 # --------------------- Admin routes ---------------------
 @app.get("/admin/users", response_model=List[UserOut])
-def admin_list_users(_: User = Depends(require_admin), db: Session = Depends(get_db)):
+def admin_list_users(_: User = Depends(require_admin), db: Session = Depends(get_db_ro)):
     users = db.query(User).order_by(User.created_at.desc()).all()
-    return _resp_list(UserOut, users)
+    return _resp_list_trusted(UserOut, users)
 
 
 @app.patch("/admin/users/{user_id}", response_model=UserOut)
@@ -578,17 +872,69 @@ def admin_toggle_admin(
 
 
 @app.get("/admin/users/{user_id}/todos", response_model=List[TodoOut])
-def admin_list_user_todos(user_id: int, _: User = Depends(require_admin), db: Session = Depends(get_db)):
+def admin_list_user_todos(user_id: int, _: User = Depends(require_admin), db: Session = Depends(get_db_ro)):
     if not db.get(User, user_id):
         raise HTTPException(status_code=404, detail="User not found")
     items = db.query(Todo).filter(Todo.owner_id == user_id).order_by(Todo.created_at.desc()).all()
-    return _resp_list(TodoOut, items)
+    return _resp_list_trusted(TodoOut, items)
+
+
+def _admin_todos_stmt():
+    return (
+        select(Todo)
+        .options(joinedload(Todo.owner))
+        .order_by(Todo.created_at.desc(), Todo.id.desc())
+    )
+
+
+def _dump_json(m) -> str:
+    return m.model_dump_json() if hasattr(m, "model_dump_json") else m.json()
 
 
 @app.get("/admin/todos", response_model=List[AdminTodoOut])
-def admin_list_all_todos(_: User = Depends(require_admin), db: Session = Depends(get_db)):
-    items = db.query(Todo).order_by(Todo.created_at.desc()).all()
-    return _resp_list(AdminTodoOut, items)
+def admin_list_all_todos(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    _: User = Depends(require_admin),
+    db: Session = Depends(get_db_ro),
+):
+    # Without `limit` the full list is returned (existing clients); with it, keyset pages on (created_at, id).
+    stmt = _admin_todos_stmt()
+    if cursor is not None:
+        # The cursor carries the keyset values, so paging survives deletion of the anchor row.
+        try:
+            created_raw, id_raw = cursor.rsplit("|", 1)
+            anchor_created, anchor_id = datetime.fromisoformat(created_raw), int(id_raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(
+            or_(
+                Todo.created_at < anchor_created,
+                and_(Todo.created_at == anchor_created, Todo.id < anchor_id),
+            )
+        )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    items = db.execute(stmt).scalars().all()
+    if limit is not None and len(items) == limit:
+        last = items[-1]
+        response.headers["X-Next-Cursor"] = f"{last.created_at.isoformat()}|{last.id}"
+    return _resp_list_trusted(AdminTodoOut, items)
+
+
+@app.get("/admin/todos/export")
+def admin_export_all_todos(_: User = Depends(require_admin)):
+    # NDJSON stream: rows are fetched and serialized in batches, so memory stays O(batch).
+    def gen():
+        db = SessionLocalRO()
+        try:
+            for item in db.execute(_admin_todos_stmt().execution_options(yield_per=500)).scalars():
+                yield _dump_json(_resp_trusted(AdminTodoOut, item)) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
 
 
 @app.delete("/admin/todos/{todo_id}", status_code=204)
@@ -611,19 +957,21 @@ def get_me(user: User = Depends(get_current_user)):
 def get_my_avatar(user: User = Depends(get_current_user)):
     s3 = _s3()
     if s3:
-        try:
-            obj = s3.get_object(Bucket=S3_BUCKET, Key=_avatar_key(user.id) + "_processed")
-            body = obj["Body"].read()
-            ct = obj.get("ContentType") or (user.profile_image_mime or "application/octet-stream")
-            return Response(content=body, media_type=ct)
-        except Exception:
+        # Redirect to a presigned URL so avatar bytes never pass through the API.
+        key = user.profile_image_key or _avatar_key(user.id)
+        last_error = None
+        for candidate in (key + "_processed", key):
             try:
-                obj = s3.get_object(Bucket=S3_BUCKET, Key=_avatar_key(user.id))
-                body = obj["Body"].read()
-                ct = obj.get("ContentType") or (user.profile_image_mime or "application/octet-stream")
-                return Response(content=body, media_type=ct)
-            except Exception as e2:
-                print(f"[S3 GET failed] {e2}")
+                s3.head_object(Bucket=S3_BUCKET, Key=candidate)
+                url = s3.generate_presigned_url(
+                    "get_object",
+                    Params={"Bucket": S3_BUCKET, "Key": candidate},
+                    ExpiresIn=AVATAR_URL_TTL_SECONDS,
+                )
+                return RedirectResponse(url, status_code=302)
+            except Exception as e:
+                last_error = e
+        print(f"[S3 GET failed] {last_error}")
     if not user.profile_image:
         raise HTTPException(status_code=404, detail="No avatar")
     return Response(content=user.profile_image, media_type=user.profile_image_mime or "application/octet-stream")
@@ -638,23 +986,32 @@ async def put_my_avatar(
     mime = file.content_type or mimetypes.guess_type(file.filename or "")[0] or "application/octet-stream"
     if mime not in {"image/jpeg", "image/png", "image/gif", "image/webp"}:
         raise HTTPException(status_code=400, detail="Unsupported image type")
-    content = await file.read()
-    if len(content) > 2 * 1024 * 1024:
+    # The upload is already spooled by Starlette; measure it without reading it into memory.
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    if size > MAX_AVATAR_BYTES:
         raise HTTPException(status_code=400, detail="Image too large (max 2MB)")
     s3 = _s3()
     if s3:
+        key = _avatar_key(user.id)
         try:
-            s3.put_object(Bucket=S3_BUCKET, Key=_avatar_key(user.id), Body=content, ContentType=mime)
+            await run_in_threadpool(
+                s3.upload_fileobj, file.file, S3_BUCKET, key, ExtraArgs={"ContentType": mime}
+            )
             user.profile_image = None
             user.profile_image_mime = mime
+            user.profile_image_key = key
             db.add(user)
             db.commit()
             db.refresh(user)
             return _resp(UserOut, user)
         except Exception as e:
             print(f"[S3 PUT failed] {e}")
-    user.profile_image = content
+            await file.seek(0)
+    user.profile_image = await file.read()  # size already bounded by the check above
     user.profile_image_mime = mime
+    user.profile_image_key = None
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -1,7 +1,10 @@
 import logging
 import os
+import shutil
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from typing import BinaryIO, Optional
 
 try:
     from PIL import Image, ImageOps
@@ -22,6 +25,16 @@ _DEFAULT_SUFFIX = "_processed"
 _DEFAULT_MAX_SIDE = 512
 _DEFAULT_FORMAT = "webp"  # webp | jpeg | png
 _DEFAULT_QUALITY = 80
+_MAX_WORKERS = 10
+_DEFAULT_MAX_SOURCE_BYTES = 20 * 1024 * 1024
+_COPY_CHUNK = 64 * 1024
+
+_FORMAT_INFO = {  # target_format -> (Pillow format, content type)
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
 
 s3 = None
 if boto3 is not None:
@@ -31,10 +44,27 @@ if boto3 is not None:
         s3 = None
 
 
-def _process_image(data: bytes, max_side: int, target_format: str, quality: int) -> tuple[bytes, str]:
+def _process_image(src: BinaryIO, max_side: int, target_format: str, quality: int) -> tuple[bytes, str]:
+    """Resize/re-encode the seekable image stream `src`."""
     if Image is None or ImageOps is None:
         raise RuntimeError("Pillow (PIL) not available. Attach a Lambda layer with Pillow.")
-    img = Image.open(BytesIO(data))
+    img = Image.open(src)  # lazy: only the header is parsed here
+    fmt = (target_format or _DEFAULT_FORMAT).lower()
+    pil_fmt, passthrough_ct = _FORMAT_INFO.get(fmt, _FORMAT_INFO["png"])
+    if (
+        img.format == pil_fmt
+        and img.mode == "RGB"
+        and max(img.size) <= max_side
+        and not getattr(img, "is_animated", False)
+        and not img.getexif()
+        and "exif" not in img.info
+        and "xmp" not in img.info
+    ):
+        # Already what re-encoding would produce (single frame, no metadata); skip decode/encode.
+        src.seek(0)
+        return src.read(), passthrough_ct
+    # Let the JPEG decoder downscale by 1/2..1/8 while decoding (no-op for other formats).
+    img.draft("RGB", (max_side, max_side))
     img = ImageOps.exif_transpose(img)
     # Color/alpha handling
     if img.mode in ("RGBA", "LA"):
@@ -49,12 +79,12 @@ def _process_image(data: bytes, max_side: int, target_format: str, quality: int)
     if max_dim > max_side:
         ratio = max_side / float(max_dim)
         new_size = (max(1, int(w * ratio)), max(1, int(h * ratio)))
-        img = img.resize(new_size, Image.LANCZOS)
+        # reducing_gap: cheap box reduce first, Lanczos only for the final step.
+        img = img.resize(new_size, Image.LANCZOS, reducing_gap=3.0)
     # Encode
     buf = BytesIO()
-    fmt = (target_format or _DEFAULT_FORMAT).lower()
     if fmt == "webp":
-        img.save(buf, format="WEBP", quality=quality, method=6)
+        img.save(buf, format="WEBP", quality=quality, method=4)
         content_type = "image/webp"
     elif fmt in ("jpg", "jpeg"):
         img.save(buf, format="JPEG", quality=quality, optimize=True)
@@ -65,12 +95,59 @@ def _process_image(data: bytes, max_side: int, target_format: str, quality: int)
     return buf.getvalue(), content_type
 
 
+def _handle_record(
+    record, prefix: str, suffix: str, target_max: int, target_fmt: str, target_quality: int, max_source: int
+) -> tuple[bool, Optional[str]]:
+    """Process one S3 record; returns (processed, failure description or None)."""
+    s3_info = record.get("s3") or {}
+    bucket = (s3_info.get("bucket") or {}).get("name")
+    obj = s3_info.get("object") or {}
+    key = urllib.parse.unquote_plus(obj.get("key", ""))
+
+    if not bucket or not key:
+        return False, None
+    if not key.startswith(prefix):
+        return False, None
+    if key.endswith(suffix):
+        logger.info("avatar-event: skipping already-processed object key=%s", key)
+        return False, None
+
+    try:
+        src = s3.get_object(Bucket=bucket, Key=key)
+        size_in = src.get("ContentLength") or 0
+        if size_in > max_source:
+            logger.info("avatar-event: skipping oversized object key=%s size=%s", key, size_in)
+            src["Body"].close()
+            return False, None
+        # StreamingBody isn't seekable; copy it in chunks into the single buffer Pillow reads from.
+        body = BytesIO()
+        shutil.copyfileobj(src["Body"], body, _COPY_CHUNK)
+        size_in = body.tell()
+        body.seek(0)
+        out_bytes, out_ct = _process_image(body, target_max, target_fmt, target_quality)
+        dest_key = f"{key}{suffix}"
+        s3.put_object(Bucket=bucket, Key=dest_key, Body=out_bytes, ContentType=out_ct)
+        logger.info(
+            "avatar-event: processed bucket=%s src=%s dest=%s size_in=%s size_out=%s",
+            bucket,
+            key,
+            dest_key,
+            size_in,
+            len(out_bytes),
+        )
+        return True, None
+    except Exception as e:
+        # Reported once per invocation by handler() rather than logged per record.
+        return False, f"bucket={bucket} key={key} error={type(e).__name__}: {e}"
+
+
 def handler(event, context):
     prefix = os.getenv("AVATAR_PREFIX", _DEFAULT_PREFIX)
     suffix = os.getenv("PROCESSED_SUFFIX", _DEFAULT_SUFFIX)
     target_max = int(os.getenv("TARGET_MAX_SIDE", str(_DEFAULT_MAX_SIDE)))
     target_fmt = os.getenv("TARGET_FORMAT", _DEFAULT_FORMAT)
     target_quality = int(os.getenv("TARGET_QUALITY", str(_DEFAULT_QUALITY)))
+    max_source = int(os.getenv("MAX_SOURCE_BYTES", str(_DEFAULT_MAX_SOURCE_BYTES)))
 
     records = event.get("Records") or []
     if not records:
@@ -81,43 +158,19 @@ def handler(event, context):
         logger.error("avatar-event: boto3/S3 client unavailable")
         return {"processed": 0, "skipped": len(records), "error": "no_s3"}
 
-    processed = 0
-    skipped = 0
-    for record in records:
-        s3_info = record.get("s3") or {}
-        bucket = (s3_info.get("bucket") or {}).get("name")
-        obj = s3_info.get("object") or {}
-        key = urllib.parse.unquote_plus(obj.get("key", ""))
-
-        if not bucket or not key:
-            skipped += 1
-            continue
-        if not key.startswith(prefix):
-            skipped += 1
-            continue
-        if key.endswith(suffix):
-            logger.info("avatar-event: skipping already-processed object key=%s", key)
-            skipped += 1
-            continue
-
-        try:
-            src = s3.get_object(Bucket=bucket, Key=key)
-            body = src["Body"].read()
-            out_bytes, out_ct = _process_image(body, target_max, target_fmt, target_quality)
-            dest_key = f"{key}{suffix}"
-            s3.put_object(Bucket=bucket, Key=dest_key, Body=out_bytes, ContentType=out_ct)
-            processed += 1
-            logger.info(
-                "avatar-event: processed bucket=%s src=%s dest=%s size_in=%s size_out=%s",
-                bucket,
-                key,
-                dest_key,
-                len(body),
-                len(out_bytes),
+    # S3 get/put dominate wall time; overlap them across records (boto3 clients are thread-safe).
+    with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(records))) as ex:
+        results = list(
+            ex.map(
+                lambda r: _handle_record(r, prefix, suffix, target_max, target_fmt, target_quality, max_source),
+                records,
             )
-        except Exception:
-            logger.exception("avatar-event: failed processing bucket=%s key=%s", bucket, key)
-            skipped += 1
+        )
 
+    processed = sum(1 for ok, _ in results if ok)
+    skipped = len(results) - processed
+    failures = [err for _, err in results if err]
+    if failures:
+        logger.error("avatar-event: %s record(s) failed:\n%s", len(failures), "\n".join(failures))
     logger.info("avatar-event: total processed=%s skipped=%s", processed, skipped)
     return {"processed": processed, "skipped": skipped}